@@ -1,4 +1,6 @@
+import os
 import sys
+from pathlib import Path
 from  klepcbgenmod import *
 import argparse
 
@@ -15,12 +17,16 @@ a keyboard designed using the Keyboard Layout Editor \
     )
     parser.add_argument(
         "infile",
-        help="A JSON file containing a keyboard layout in the KLE JSON format",
+        nargs="+",
+        help="A JSON file containing a keyboard layout in the KLE JSON format. When multiple \
+                files are given, their projects are generated in parallel",
     )
     parser.add_argument(
         "outname",
         help='The base name of the output files (e.g. "id80" will result in "id80.sch" and \
-                "id80.pcb"',
+                "id80.pcb". When multiple input files are given, this is the directory in which \
+                a project named after each input file is generated. The input file names must be \
+                unique in that case',
     )
     args = parser.parse_args()
 
@@ -30,11 +36,34 @@ a keyboard designed using the Keyboard Layout Editor \
             "Not all required arguments are present. Use the options '-h' for more information"
         )
 
+    # With multiple input files, each project is named after its input file
+    if len(args.infile) > 1:
+        infiles_per_name = {}
+        for infile in args.infile:
+            infiles_per_name.setdefault(Path(infile).stem, []).append(infile)
+        clashes = [infiles for infiles in infiles_per_name.values() if len(infiles) > 1]
+        if clashes:
+            parser.error(
+                "Input files must have unique names, since each project is named after its input \
+file. Clashing input files: "
+                + "; ".join(", ".join(infiles) for infiles in clashes)
+            )
+
     return args
 
 # Program entry
 if __name__ == "__main__":
     arguments = parse_command_line_arguments()
-    kbpcbgen = KLEPCBGenerator()
-    kbpcbgen.generate_kicadproject(arguments)
-    kbpcbgen.keyboard.print_key_info()
\ No newline at end of file
+    if len(arguments.infile) == 1:
+        generate_single_kicadproject(
+            argparse.Namespace(infile=arguments.infile[0], outname=arguments.outname)
+        )
+    else:
+        generate_many_kicadprojects(
+            [
+                argparse.Namespace(
+                    infile=infile, outname=os.path.join(arguments.outname, Path(infile).stem)
+                )
+                for infile in arguments.infile
+            ]
+        )
\ No newline at end of file
@@ -6,8 +6,12 @@ import datetime
 import os
 import math
 
+from bisect import bisect_right
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 from pathlib import Path
-from jinja2 import Environment, FileSystemLoader, StrictUndefined
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, StrictUndefined
 
 # Program version
 PROGRAM_VERSION = "0.1"
@@ -15,6 +19,63 @@ PROGRAM_VERSION = "0.1"
 # Constants
 MAX_ROWS = 7
 MAX_COLS = 18
+# Size of the write buffer used for the generated output files
+OUTPUT_BUFFER_SIZE = 1 << 18
+# Distance between neighbouring keys in the layout (mm)
+KEY_PITCH = 19.05
+# Positions of the diode, vias and trace ends of a key in the layout, relative to its switch (mm)
+DIODE_OFFSET = (-6.35, 8.89)
+COL_VIA_OFFSETS = ((0, -2.03), (0, 12.24))
+ROW_VIA_OFFSETS = ((-9.68, 9.83), (4.6, 9.83))
+DIODE_TRACE_OFFSETS = ((-6.38, 2.54), (-6.38, 7.77))
+# Nets of the control circuit, besides the row and column nets
+CONTROL_CIRCUIT_NETS = (
+    "GND",
+    "VCC",
+    '"Net-(C6-Pad1)"',
+    '"Net-(C7-Pad1)"',
+    '"Net-(C8-Pad1)"',
+    '"Net-(J1-Pad4)"',
+    '"Net-(J1-Pad3)"',
+    '"Net-(J1-Pad2)"',
+    '"Net-(R1-Pad1)"',
+    '"Net-(R2-Pad1)"',
+    '"Net-(R3-Pad1)"',
+    '"Net-(R4-Pad2)"',
+    '"Net-(U1-Pad42)"',
+    "/Reset",
+)
+# Fields substituted in the per-key layout template
+PERKEY_FIELDS = (
+    "num",
+    "x",
+    "y",
+    "keywidth",
+    "diode_x",
+    "diode_y",
+    "col_via1_x",
+    "col_via1_y",
+    "col_via2_x",
+    "col_via2_y",
+    "row_via1_x",
+    "row_via1_y",
+    "row_via2_x",
+    "row_via2_y",
+    "diode_trace1_x",
+    "diode_trace1_y",
+    "diode_trace2_x",
+    "diode_trace2_y",
+    "diodenetnum",
+    "diodenetname",
+    "colnetnum",
+    "colnetname",
+    "rownetnum",
+    "rownetname",
+)
+# Names of the row, column and diode nets of the key matrix
+ROW_NETNAME = "/Row_{}"
+COL_NETNAME = "/Col_{}"
+DIODE_NETNAME = '"Net-(D{}-Pad2)"'
 
 class KeyBlockCollection:
     """Maintains a collection of blocks of keyboard keys, such as columns or rows"""
@@ -26,13 +87,16 @@ class KeyBlockCollection:
            If the block does not exist, it gets created at the specified index, inserting a
            number of empty blocks if necessary"""
         # Check if the block exists, and add a number of blocks if needed
-        blocks_to_add = (block_index + 1) - len(self.blocks)
-        if blocks_to_add > 0:
-            for _ in range(blocks_to_add):
-                self.blocks.append([])
-
+        self.ensure_size(block_index + 1)
         self.blocks[block_index].append(key_index)
 
+    def ensure_size(self, num_blocks):
+        """Make sure the collection contains at least the specified number of blocks, appending
+           empty blocks if necessary"""
+        blocks_to_add = num_blocks - len(self.blocks)
+        if blocks_to_add > 0:
+            self.blocks.extend([] for _ in range(blocks_to_add))
+
     def get_block(self, block_index):
         """Get the coimplete"""
         return self.blocks[block_index]
@@ -76,48 +140,65 @@ class Keyboard:
 
 class Key:
     """All required information about a single keyboard key"""
-    x_unit = 0
-    y_unit = 0
-    width = 0
-    height = 0
-    row = 0
-    col = 0
-    rot = 0
-    diodenetnum = 0
-    colnetnum = 0
-    rownetnum = 0
-    num = 0
-    legend = "<N/A>"
-
+    __slots__ = (
+        "x_unit",
+        "y_unit",
+        "width",
+        "height",
+        "row",
+        "col",
+        "rot",
+        "diodenetnum",
+        "colnetnum",
+        "rownetnum",
+        "num",
+        "legend",
+        "footprint_width",
+    )
 
+    def __init__(self):
+        self.x_unit = 0
+        self.y_unit = 0
+        self.width = 0
+        self.height = 0
+        self.row = 0
+        self.col = 0
+        self.rot = 0
+        self.diodenetnum = 0
+        self.colnetnum = 0
+        self.rownetnum = 0
+        self.num = 0
+        self.legend = "<N/A>"
+        self.footprint_width = "1.00"
+
+
+# Available footprint widths, and the key widths (in units) from which each one is used. The
+# footprints are not appropriate for every width in between, but this is what we have
+FOOTPRINT_WIDTH_THRESHOLDS = (1.25, 1.5, 1.75, 2, 2.25, 2.75, 6.25)
+FOOTPRINT_WIDTHS = ("1.00", "1.25", "1.50", "1.75", "2.00", "2.25", "2.75", "6.25")
+
+@lru_cache(maxsize=None)
 def unit_width_to_available_footprint(unit_width):
     """Convert a key width in standard keyboard units to the width of the kicad
        footprint to use"""
-    if unit_width < 1.25:
-        return "1.00"
-    elif unit_width < 1.5:
-        return "1.25"
-    elif unit_width < 1.75:
-        return "1.50"
-    elif unit_width < 2:
-        return "1.75"
-    elif unit_width < 2.25:
-        return "2.00"
-    elif unit_width < 2.75:
-        return "2.25"
-    elif unit_width < 6.25:
-        # This may not be the appropriate size for everything between 2.75 and
-        # 6.25, but this is what we have
-        return "2.75"
-
-    # This may not be the appropriate size for everything >= 6.25, but this
-    # is what we have
-    return "6.25"
+    return FOOTPRINT_WIDTHS[bisect_right(FOOTPRINT_WIDTH_THRESHOLDS, unit_width)]
+
+def template_to_format_string(template, field_names):
+    """Convert a template that only substitutes the specified fields into an equivalent
+       str.format() format string, by rendering it once with a marker in place of each field"""
+    markers = {name: "\0" + name + "\0" for name in field_names}
+    format_string = template.render(**markers).replace("{", "{{").replace("}", "}}")
+    for name, marker in markers.items():
+        format_string = format_string.replace(marker, "{" + name + "}")
+
+    return format_string
 
 class Nets:
     """Maintains a collection of nets for use in the schematic"""
     def __init__(self):
         self.nets = []
+        # Net number of each net, keyed by net name
+        self.net_nums = {}
 
     def number_of_nets(self):
         """Get the number of nets in the collection"""
@@ -125,18 +206,19 @@ class Nets:
 
     def add_net(self, net_name):
         """Add a net to the collection"""
-        if not net_name in self.nets:
+        if not net_name in self.net_nums:
             self.nets.append(net_name)
+            self.net_nums[net_name] = len(self.nets)
+
+        return self.net_nums[net_name]
 
-        return self.get_net_num(net_name)
+    def add_nets(self, net_names):
+        """Add a number of nets to the collection, and return their net numbers"""
+        return [self.add_net(net_name) for net_name in net_names]
 
     def get_net_num(self, net_name):
         """Get the net number of the net with the specified name"""
-        for index, name in enumerate(self.nets):
-            if name == net_name:
-                return index + 1
-
-        return 0
+        return self.net_nums.get(net_name, 0)
 
     def get_net_name(self, index):
         """Get the name of the net with the specified net number"""
@@ -146,8 +228,20 @@ class Nets:
             return "UNKNOWN"
 
 class KLEPCBGenerator:
-    """Wrapper around the entire generator parses arguments, load json and generate kicad project"""
-    keyboard = Keyboard()
+    """Wrapper around the entire generator parses arguments, load json and generate kicad project
+
+       Performance notes: generating a project is CPU-bound in the Python interpreter, not in
+       I/O or memory bandwidth, and a board has at most MAX_ROWS * MAX_COLS keys. The work that
+       scales with the number of keys is:
+       - place_layout_components: one str.format of the pre-rendered layout/perkey.tpl per key
+       - place_schematic_components: one iteration of the loop in schematic/keyswitches.tpl
+         per key
+       - define_nets: one net per diode, plus assigning net numbers to every key
+       - read_kle_json: a Python loop over every element of the KLE json
+       Templates are loaded once and their compiled form is cached on disk, rendered output is
+       streamed to the files, and trivial substitutions such as net names don't use Jinja.
+       Vectorizing (NumPy) or SIMD approaches don't apply: the data is small and the work is
+       string formatting"""
 
     def __init__(self):
         """ Set-up directories """
@@ -155,20 +249,50 @@ class KLEPCBGenerator:
         self.jinja_env = Environment(
             loader=FileSystemLoader([self.project_dir / "templates"]),
             undefined=StrictUndefined,
+            # The templates don't change while running, and the compiled templates are cached
+            # on disk so subsequent runs don't need to parse them again
+            auto_reload=False,
+            bytecode_cache=FileSystemBytecodeCache(),
         )
+        self.keyboard = Keyboard()
         self.nets = Nets()
+        self.row_netnames = []
+        self.col_netnames = []
+        self.diode_netnames = []
+        self.output_dir = Path()
+        self.project_name = ""
+
+        # Load all templates once, so the per-key loops don't repeat the lookup
+        self.sch_controlcircuit_tpl = self.jinja_env.get_template("schematic/controlcircuit.tpl")
+        self.schematic_tpl = self.jinja_env.get_template("schematic/schematic.tpl")
+        # The per-key layout template only substitutes values, so it is rendered once into a
+        # format string that is filled in for every key
+        self.perkey_format = template_to_format_string(
+            self.jinja_env.get_template("layout/perkey.tpl"), PERKEY_FIELDS
+        )
+        self.nets_tpl = self.jinja_env.get_template("layout/nets.tpl")
+        self.layout_tpl = self.jinja_env.get_template("layout/layout.tpl")
+        self.layout_controlcircuit_tpl = self.jinja_env.get_template("layout/controlcircuit.tpl")
+        self.project_tpl = self.jinja_env.get_template("kicadproject.tpl")
 
     def generate_kicadproject(self, arguments):
         """Generate the kicad project. Main entry point"""
 
-        if not os.path.exists(arguments.outname):
-            os.mkdir(arguments.outname)
+        # The project is generated in the output directory, and named after it
+        self.output_dir = Path(arguments.outname)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.project_name = os.path.basename(os.path.normpath(arguments.outname))
 
         self.read_kle_json(arguments)
         self.generate_rows_and_columns()
-        self.generate_schematic(arguments)
-        self.generate_layout(arguments)
-        self.generate_project(arguments)
+        self.generate_net_names()
+        self.generate_schematic()
+        self.generate_layout()
+        self.generate_project()
+
+    def output_file_path(self, extension):
+        """Get the path of the project file with the specified extension"""
+        return self.output_dir / (self.project_name + extension)
 
     def read_kle_json(self, args):
         """ Read the provided KLE input file and create a list of all the keyswitches that should
@@ -176,31 +300,38 @@ class KLEPCBGenerator:
 
         print("Reading input file '" + args.infile + "' ...")
 
-        with open(args.infile, "r", encoding="latin-1") as read_file:
-            kle_json = json.load(read_file)
+        # KLE exports UTF-8, which json detects when given the raw bytes. Fall back to latin-1
+        # for older files that are not valid UTF-8
+        kle_data = Path(args.infile).read_bytes()
+        try:
+            kle_json = json.loads(kle_data)
+        except UnicodeDecodeError:
+            kle_json = json.loads(kle_data.decode("latin-1"))
+        if not isinstance(kle_json, list):
+            print("Expected a JSON array of KLE rows, found (", kle_json, "). Exiting")
+            exit()
 
         # First create a list of switches, each with its own X,Y coordinate
         current_x = 0.0
         current_y = 0.0
         key_num = 0
+        add_key = self.keyboard.keys.append
+        # The JSON decoder only produces plain lists, dicts and strings, so exact type checks
+        # suffice in the loop below
         for row in kle_json:
-            if isinstance(row, list):
+            if type(row) is list:
                 # Default keysize is 1x1
                 key_width = 1
                 key_height = 1
                 # Extract all keys in a row
                 for item in row:
-                    if isinstance(item, dict):
-                        for key, value in item.items():
-                            if key == "x":
-                                current_x += value
-                            elif key == "y":
-                                current_y += value
-                            elif key == "w":
-                                key_width = value
-                            elif key == "h":
-                                key_height = value
-                    elif isinstance(item, str):
+                    if type(item) is dict:
+                        # Only the position and size properties matter for the PCB
+                        current_x += item.get("x", 0)
+                        current_y += item.get("y", 0)
+                        key_width = item.get("w", key_width)
+                        key_height = item.get("h", key_height)
+                    elif type(item) is str:
                         new_key = Key()
                         new_key.num = key_num
                         new_key.x_unit = current_x + key_width / 2
@@ -208,7 +339,8 @@ class KLEPCBGenerator:
                         new_key.legend = item
                         new_key.width = key_width
                         new_key.height = key_height
-                        self.keyboard.keys.append(new_key)
+                        new_key.footprint_width = unit_width_to_available_footprint(key_width)
+                        add_key(new_key)
 
                         current_x += key_width
                         key_num += 1
@@ -233,272 +365,172 @@ class KLEPCBGenerator:
         print("Grouping keys in rows and columns ... ")
 
         # For each key in the board, determine the X,Y of the center of the key. This determines
-        # the row/column a key is in
-        keysInRow = [0] * MAX_ROWS
-        for index, key in enumerate(self.keyboard.keys):
-            centery = key.y_unit
-            row = math.floor(centery)
+        # the row/column a key is in. The rows of all keys are determined in a single pass up
+        # front, so the layout can be rejected before any key is grouped
+        key_rows = [math.floor(key.y_unit) for key in self.keyboard.keys]
+        if not key_rows:
+            return
 
-            if row > MAX_ROWS-1:
-                exit("ERROR: Key placement produced too many rows. klepcbgen currently cannot generate a valid KiCad project for this keyboard layout.\nExiting ...")
+        if max(key_rows) > MAX_ROWS-1:
+            exit("ERROR: Key placement produced too many rows. klepcbgen currently cannot generate a valid KiCad project for this keyboard layout.\nExiting ...")
 
+        # Rows are used as indices below, so a key above the first row can't be grouped
+        if min(key_rows) < 0:
+            exit("ERROR: Key placement produced a key above the first row. klepcbgen currently cannot generate a valid KiCad project for this keyboard layout.\nExiting ...")
+
+        # Keys are assigned to columns in order within their row, so the longest row determines
+        # the number of columns
+        num_cols = max(Counter(key_rows).values())
+        if num_cols > MAX_COLS:
+            exit("ERROR: Key placement produced too many columns. klepcbgen currently cannot generate a valid KiCad project for this keyboard layout.\nExiting ...")
+
+        self.keyboard.rows.ensure_size(max(key_rows) + 1)
+        self.keyboard.columns.ensure_size(num_cols)
+
+        keysInRow = [0] * MAX_ROWS
+        for index, (key, row) in enumerate(zip(self.keyboard.keys, key_rows)):
             self.keyboard.add_key_to_row(row, index)
-            self.keyboard.keys[index].row = row
+            key.row = row
 
             col = keysInRow[row]
             keysInRow[row] += 1
-            
-            if col > MAX_COLS-1:
-                exit("ERROR: Key placement produced too many columns. klepcbgen currently cannot generate a valid KiCad project for this keyboard layout.\nExiting ...")
 
             self.keyboard.add_key_to_col(col, index)
-            self.keyboard.keys[index].col = col
+            key.col = col
+
+    def generate_net_names(self):
+        """ Determine the names of all the row, column and diode nets once, so they can be reused
+            when defining the nets and placing the components """
+        # Always name the max number of rows and columns, since the control circuit refers to them
+        self.row_netnames = [ROW_NETNAME.format(row_num) for row_num in range(MAX_ROWS)]
+        self.col_netnames = [COL_NETNAME.format(col_num) for col_num in range(MAX_COLS)]
+        self.diode_netnames = [
+            DIODE_NETNAME.format(diode_num) for diode_num in range(len(self.keyboard.keys))
+        ]
 
     def place_schematic_components(self):
-        """Place schematic components determined by the layout(keyswitches and diodes)"""
-        switch_tpl = self.jinja_env.get_template("schematic/keyswitch.tpl")
-
-        component_count = 0
-        components_section = ""
-
+        """Place schematic components determined by the layout(keyswitches and diodes). The
+           parameters of each keyswitch (number, x, y, row, column and footprint width) are
+           yielded one at a time, and the schematic template renders them all in a single loop"""
         # Place keyswitches and diodes
-        for key in self.keyboard.keys:
+        for component_count, key in enumerate(self.keyboard.keys):
             placement_x = int(600 + key.x_unit * 800)
             placement_y = int(800 + key.y_unit * 500)
 
-            components_section = components_section + switch_tpl.render(
-                num=component_count,
-                x=placement_x,
-                y=placement_y,
-                rowNum=key.row,
-                colNum=key.col,
-                keywidth=unit_width_to_available_footprint(key.width),
+            yield (
+                component_count,
+                placement_x,
+                placement_y,
+                key.row,
+                key.col,
+                key.footprint_width,
             )
-            components_section = components_section + "\n"
-            component_count += 1
-
-        return components_section
 
-    def generate_schematic(self, args):
+    def generate_schematic(self):
         """ Generate schematic """
 
         print("Generating schematic ...")
 
-        components = self.place_schematic_components()
-        control_circuit = self.jinja_env.get_template("schematic/controlcircuit.tpl")
-        schematic = self.jinja_env.get_template("schematic/schematic.tpl")
+        keyswitches = self.place_schematic_components()
         now = datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
         comment = (
             "Generated by " + os.path.basename(sys.argv[0]) + " v" + PROGRAM_VERSION
         )
         with open(
-                args.outname + "/" + os.path.basename(os.path.normpath(args.outname)) + ".sch", "w+", newline="\n"
+                self.output_file_path(".sch"), "w+", newline="\n",
+                buffering=OUTPUT_BUFFER_SIZE
         ) as out_file:
-            out_file.write(
-                schematic.render(
-                    components=components,
-                    controlcircuit=control_circuit.render(),
-                    title=self.keyboard.name,
-                    author=self.keyboard.author,
-                    date=now,
-                    comment=comment,
-                )
-            )
+            self.schematic_tpl.stream(
+                keyswitches=keyswitches,
+                controlcircuit=self.sch_controlcircuit_tpl.render(),
+                title=self.keyboard.name,
+                author=self.keyboard.author,
+                date=now,
+                comment=comment,
+            ).dump(out_file)
 
     def place_layout_components(self):
-        """ Place footprint components, traces and vias """
-        switch = self.jinja_env.get_template("layout/keyswitch.tpl")
-        diode = self.jinja_env.get_template("layout/diode.tpl")
-        component_count = 0
-        components_section = ""
-
-        # Load templates for netnames
-        diodetpl = self.jinja_env.get_template("layout/diodenetname.tpl")
-        rowtpl = self.jinja_env.get_template("layout/rownetname.tpl")
-        coltpl = self.jinja_env.get_template("layout/colnetname.tpl")
-        viatpl = self.jinja_env.get_template("layout/via.tpl")
-        tracetpl = self.jinja_env.get_template("layout/trace.tpl")
+        """ Place footprint components, traces and vias. The rendered components are yielded one
+            at a time, so they can be streamed to the output file """
 
         # Place keyswitches, diodes, vias and traces
-        key_pitch = 19.05
-        diode_offset = [-6.35, 8.89]
-        col_via_offsets = [[0, -2.03], [0, 12.24]]
-        row_via_offsets = [[-9.68, 9.83], [4.6, 9.83]]
-        diode_trace_offsets = [[-6.38, 2.54], [-6.38, 7.77]]
-
-        for key in self.keyboard.keys:
-            # Place switch
+        key_pitch = KEY_PITCH
+        diode_offset_x, diode_offset_y = DIODE_OFFSET
+        (col_via1_x, col_via1_y), (col_via2_x, col_via2_y) = COL_VIA_OFFSETS
+        (row_via1_x, row_via1_y), (row_via2_x, row_via2_y) = ROW_VIA_OFFSETS
+        (diode_trace1_x, diode_trace1_y), (diode_trace2_x, diode_trace2_y) = DIODE_TRACE_OFFSETS
+
+        # Bind everything the per-key loop uses to locals
+        format_key = self.perkey_format.format
+        diode_netnames = self.diode_netnames
+        col_netnames = self.col_netnames
+        row_netnames = self.row_netnames
+
+        for component_count, key in enumerate(self.keyboard.keys):
+            # Place switch, diode, vias and traces of this key in a single substitution
             ref_x = -100 + key.x_unit * key_pitch
             ref_y = 17.78 + key.y_unit * key_pitch
-            components_section = (
-                components_section
-                + switch.render(
-                    num=component_count,
-                    x=ref_x,
-                    y=ref_y,
-                    diodenetnum=key.diodenetnum,
-                    diodenetname=diodetpl.render(diodenum=key.num),
-                    colnetnum=key.colnetnum,
-                    colnetname=coltpl.render(colnum=key.col),
-                    keywidth=unit_width_to_available_footprint(key.width),
-                )
-                + "\n"
-            )
-            # Place diode
-            diode_x = ref_x + diode_offset[0]
-            diode_y = ref_y + diode_offset[1]
-            components_section = (
-                components_section
-                + diode.render(
-                    num=component_count,
-                    x=diode_x,
-                    y=diode_y,
-                    diodenetnum=key.diodenetnum,
-                    diodenetname=diodetpl.render(diodenum=key.num),
-                    rownetnum=key.rownetnum,
-                    rownetname=rowtpl.render(rownum=key.row),
-                )
-                + "\n"
-            )
-
-            # Place vias
-            for offset in col_via_offsets:
-                via_x = ref_x + offset[0]
-                via_y = ref_y + offset[1]
-                components_section = (
-                    components_section
-                    + viatpl.render(x=via_x, y=via_y, netnum=key.colnetnum)
-                    + "\n"
-                )
-
-            for offset in row_via_offsets:
-                via_x = ref_x + offset[0]
-                via_y = ref_y + offset[1]
-                components_section = (
-                    components_section
-                    + viatpl.render(x=via_x, y=via_y, netnum=key.rownetnum)
-                    + "\n"
-                )
-
-            # Place traces
-            components_section = (
-                components_section
-                + tracetpl.render(
-                    x1=ref_x + row_via_offsets[0][0],
-                    y1=ref_y + row_via_offsets[0][1],
-                    x2=ref_x + row_via_offsets[1][0],
-                    y2=ref_y + row_via_offsets[1][1],
-                    layer="B.Cu",
-                    netnum=key.rownetnum,
-                )
-                + "\n"
-            )
-
-            components_section = (
-                components_section
-                + tracetpl.render(
-                    x1=ref_x + col_via_offsets[0][0],
-                    y1=ref_y + col_via_offsets[0][1],
-                    x2=ref_x + col_via_offsets[1][0],
-                    y2=ref_y + col_via_offsets[1][1],
-                    layer="F.Cu",
-                    netnum=key.colnetnum,
-                )
-                + "\n"
-            )
-
-            components_section = (
-                components_section
-                + tracetpl.render(
-                    x1=ref_x + diode_trace_offsets[0][0],
-                    y1=ref_y + diode_trace_offsets[0][1],
-                    x2=ref_x + diode_trace_offsets[1][0],
-                    y2=ref_y + diode_trace_offsets[1][1],
-                    layer="B.Cu",
-                    netnum=key.diodenetnum,
-                )
-                + "\n"
+            yield format_key(
+                num=component_count,
+                x=ref_x,
+                y=ref_y,
+                keywidth=key.footprint_width,
+                diode_x=ref_x + diode_offset_x,
+                diode_y=ref_y + diode_offset_y,
+                col_via1_x=ref_x + col_via1_x,
+                col_via1_y=ref_y + col_via1_y,
+                col_via2_x=ref_x + col_via2_x,
+                col_via2_y=ref_y + col_via2_y,
+                row_via1_x=ref_x + row_via1_x,
+                row_via1_y=ref_y + row_via1_y,
+                row_via2_x=ref_x + row_via2_x,
+                row_via2_y=ref_y + row_via2_y,
+                diode_trace1_x=ref_x + diode_trace1_x,
+                diode_trace1_y=ref_y + diode_trace1_y,
+                diode_trace2_x=ref_x + diode_trace2_x,
+                diode_trace2_y=ref_y + diode_trace2_y,
+                diodenetnum=key.diodenetnum,
+                diodenetname=diode_netnames[key.num],
+                colnetnum=key.colnetnum,
+                colnetname=col_netnames[key.col],
+                rownetnum=key.rownetnum,
+                rownetname=row_netnames[key.row],
             )
+            yield "\n"
 
             # Place stabilizer mount holes, if necessary
 
-            component_count += 1
-
-        return components_section, component_count
-
     def define_nets(self):
-        """Define all the nets for this layout"""
-        self.nets.add_net("GND")
-        self.nets.add_net("VCC")
-        self.nets.add_net('"Net-(C6-Pad1)"')
-        self.nets.add_net('"Net-(C7-Pad1)"')
-        self.nets.add_net('"Net-(C8-Pad1)"')
-        self.nets.add_net('"Net-(J1-Pad4)"')
-        self.nets.add_net('"Net-(J1-Pad3)"')
-        self.nets.add_net('"Net-(J1-Pad2)"')
-        self.nets.add_net('"Net-(R1-Pad1)"')
-        self.nets.add_net('"Net-(R2-Pad1)"')
-        self.nets.add_net('"Net-(R3-Pad1)"')
-        self.nets.add_net('"Net-(R4-Pad2)"')
-        self.nets.add_net('"Net-(U1-Pad42)"')
-        self.nets.add_net('/Reset')
-
-        row_tpl = self.jinja_env.get_template("layout/rownetname.tpl")
+        """Define all the nets for this layout, and assign the row, column and diode net numbers
+           to each key"""
+        self.nets.add_nets(CONTROL_CIRCUIT_NETS)
+
         # Always declare the max number of row nets, since the control circuit template refers to them
-        for row_num in range(MAX_ROWS): 
-            self.nets.add_net(row_tpl.render(rownum=row_num))
+        row_netnums = self.nets.add_nets(self.row_netnames)
 
-        col_tpl = self.jinja_env.get_template("layout/colnetname.tpl")
         # Always declare the max number of column nets, since the control circuit template refers to them
-        for col_num in range(MAX_COLS): 
-            self.nets.add_net(col_tpl.render(colnum=col_num))
+        col_netnums = self.nets.add_nets(self.col_netnames)
 
-        diode_tpl = self.jinja_env.get_template("layout/diodenetname.tpl")
-        for diode_num in range(len(self.keyboard.keys)):
-            self.nets.add_net(diode_tpl.render(diodenum=diode_num))
+        diode_netnums = self.nets.add_nets(self.diode_netnames)
+
+        # make each key in the board aware in which row/column/diode net it resides
+        for key in self.keyboard.keys:
+            key.rownetnum = row_netnums[key.row]
+            key.colnetnum = col_netnums[key.col]
+            key.diodenetnum = diode_netnums[key.num]
 
     def create_layout_nets(self):
         """ Create the list of nets in the layout """
-        addnets = ""
-        declarenets = ""
-
         # Create a declaration and addition for each net
-        for netnum in range(0, 1 + self.nets.number_of_nets()):
-            netname = self.nets.get_net_name(netnum)
-            declarenets = (
-                declarenets + "  (net " + str(netnum + 1) + " " + netname + ")\n"
-            )
-            addnets = addnets + "    (add_net " + netname + ")\n"
-
-        # make each key in the board aware in which row/column/diode net it resides
-        rowtpl = self.jinja_env.get_template("layout/rownetname.tpl")
-        for index, row in enumerate(self.keyboard.rows.blocks):
-            rownetname = rowtpl.render(rownum=index)
-            for keyindex in row:
-                self.keyboard.keys[keyindex].rownetnum = self.nets.get_net_num(
-                    rownetname
-                )
-
-        coltpl = self.jinja_env.get_template("layout/colnetname.tpl")
-        for index, col in enumerate(self.keyboard.columns.blocks):
-            colnetname = coltpl.render(colnum=index)
-            for keyindex in col:
-                self.keyboard.keys[keyindex].colnetnum = self.nets.get_net_num(
-                    colnetname
-                )
-
-        diodetpl = self.jinja_env.get_template("layout/diodenetname.tpl")
-        for diodenum in range(len(self.keyboard.keys)):
-            diodenetname = diodetpl.render(diodenum=diodenum)
-            self.keyboard.keys[diodenum].diodenetnum = self.nets.get_net_num(
-                diodenetname
-            )
-
-        nets = self.jinja_env.get_template("layout/nets.tpl")
+        declarenets = "".join(
+            f"  (net {netnum} {netname})\n"
+            for netnum, netname in enumerate(self.nets.nets, start=1)
+        )
+        addnets = "".join(f"    (add_net {netname})\n" for netname in self.nets.nets)
 
-        return nets.render(netdeclarations=declarenets, addnets=addnets)
+        return self.nets_tpl.render(netdeclarations=declarenets, addnets=addnets)
 
-    def generate_layout(self, args):
+    def generate_layout(self):
         """ Generate layout """
 
         print("Generating PCB layout ...")
@@ -506,27 +538,38 @@ class KLEPCBGenerator:
         self.define_nets()
         nets = self.create_layout_nets()
 
-        components, numcomponents = self.place_layout_components()
-
-        layout = self.jinja_env.get_template("layout/layout.tpl")
-        controlcircuit = self.jinja_env.get_template("layout/controlcircuit.tpl")
-        layout_output_file_path = args.outname + "/" + os.path.basename(os.path.normpath(args.outname)) + ".kicad_pcb"
-        with open(layout_output_file_path, "w+", newline="\n") as out_file:
-            out_file.write(
-                layout.render(
-                    modules=components,
-                    nummodules=numcomponents,
-                    nets=nets,
-                    numnets=self.nets.number_of_nets(),
-                    controlcircuit=controlcircuit.render(nets=self.nets, startnet=0),
-                )
-            )
+        components = self.place_layout_components()
 
-    def generate_project(self, args):
+        layout_output_file_path = self.output_file_path(".kicad_pcb")
+        with open(
+                layout_output_file_path, "w+", newline="\n", buffering=OUTPUT_BUFFER_SIZE
+        ) as out_file:
+            self.layout_tpl.stream(
+                modules=components,
+                nummodules=len(self.keyboard.keys),
+                nets=nets,
+                numnets=self.nets.number_of_nets(),
+                controlcircuit=self.layout_controlcircuit_tpl.render(nets=self.nets, startnet=0),
+            ).dump(out_file)
+
+    def generate_project(self):
         """Generate the project file"""
-        prj = self.jinja_env.get_template("kicadproject.tpl")
         with open(
-                args.outname + "/" + os.path.basename(os.path.normpath(args.outname)) + ".pro", "w+", newline="\n"
+                self.output_file_path(".pro"), "w+", newline="\n",
+                buffering=OUTPUT_BUFFER_SIZE
         ) as out_file:
-            out_file.write(prj.render())
+            out_file.write(self.project_tpl.render())
+
+
+def generate_single_kicadproject(arguments):
+    """Generate the kicad project for a single KLE input file, using a generator of its own"""
+    kbpcbgen = KLEPCBGenerator()
+    kbpcbgen.generate_kicadproject(arguments)
+    kbpcbgen.keyboard.print_key_info()
 
+def generate_many_kicadprojects(arguments_list):
+    """Generate the kicad projects for a number of KLE input files. The projects are independent,
+       so they are generated in parallel in separate processes. Each project must have an output
+       name of its own"""
+    with ProcessPoolExecutor() as executor:
+        list(executor.map(generate_single_kicadproject, arguments_list))
@@ -1 +0,0 @@
-/Col_{{colnum}}
\ No newline at end of file
@@ -1 +0,0 @@
-"Net-(D{{diodenum}}-Pad2)"
\ No newline at end of file
@@ -92,7 +92,7 @@
 
 {{nets}}
 
-{{modules}}
+{% for module in modules %}{{module}}{% endfor %}
 
 {{controlcircuit}}
 
@@ -0,0 +1,9 @@
+{% include "layout/keyswitch.tpl" %}
+{% with x=diode_x, y=diode_y %}{% include "layout/diode.tpl" %}{% endwith %}
+  (via (at {{col_via1_x}} {{col_via1_y}}) (size 0.8) (drill 0.4) (layers F.Cu B.Cu) (net {{colnetnum}}))
+  (via (at {{col_via2_x}} {{col_via2_y}}) (size 0.8) (drill 0.4) (layers F.Cu B.Cu) (net {{colnetnum}}))
+  (via (at {{row_via1_x}} {{row_via1_y}}) (size 0.8) (drill 0.4) (layers F.Cu B.Cu) (net {{rownetnum}}))
+  (via (at {{row_via2_x}} {{row_via2_y}}) (size 0.8) (drill 0.4) (layers F.Cu B.Cu) (net {{rownetnum}}))
+  (segment (start {{row_via1_x}} {{row_via1_y}}) (end {{row_via2_x}} {{row_via2_y}}) (width 0.25) (layer B.Cu) (net {{rownetnum}}))
+  (segment (start {{col_via1_x}} {{col_via1_y}}) (end {{col_via2_x}} {{col_via2_y}}) (width 0.25) (layer F.Cu) (net {{colnetnum}}))
+  (segment (start {{diode_trace1_x}} {{diode_trace1_y}}) (end {{diode_trace2_x}} {{diode_trace2_y}}) (width 0.25) (layer B.Cu) (net {{diodenetnum}}))
@@ -1 +0,0 @@
-/Row_{{rownum}}
\ No newline at end of file
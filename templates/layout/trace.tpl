@@ -1 +0,0 @@
-  (segment (start {{x1}} {{y1}}) (end {{x2}} {{y2}}) (width 0.25) (layer {{layer}}) (net {{netnum}}))
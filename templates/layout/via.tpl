@@ -1 +0,0 @@
-  (via (at {{x}} {{y}}) (size 0.8) (drill 0.4) (layers F.Cu B.Cu) (net {{netnum}}))
@@ -1,4 +1,4 @@
-$Comp
+{% for num, x, y, rowNum, colNum, keywidth in keyswitches %}$Comp
 L Switch:SW_Push K{{num}}
 U 1 1 KEYSWITCH_{{num}}
 P {{x+200}} {{y}}
@@ -24,3 +24,4 @@ Text Label {{x+400}}  {{y+300}} 0    50   ~ 0
 Row_{{rowNum}}
 Text Label {{x}}  {{y}} 2    50   ~ 0
 Col_{{colNum}}
+{% endfor %}
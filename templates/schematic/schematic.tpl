@@ -13,6 +13,6 @@ Comment2 "{{comment}}"
 Comment3 ""
 Comment4 ""
 $EndDescr
-{{components}}
+{% include "schematic/keyswitches.tpl" %}
 {{controlcircuit}}
 $EndSCHEMATC
\ No newline at end of file